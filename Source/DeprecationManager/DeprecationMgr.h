@@ -30,7 +30,11 @@
 
 // ==========================================================
 
-#if !defined(_M_X64) && defined(_MSC_VER)
+#if defined(NDEBUG)
+	// release builds do not record deprecated calls
+	#define DEPRECATE(a,b)
+
+#elif !defined(_M_X64) && defined(_MSC_VER)
 	#define DEPRECATE(a,b) \
 	{ \
 		void *fptr;	\
@@ -76,6 +76,73 @@ typedef enum {
 	LoadAsHalfFloat		= 6
 } TIFFLoadMethod;
 
+// ----------------------------------------------------------
+//   half float conversion
+// ----------------------------------------------------------
+
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__)) && \
+	(defined(__clang__) || __GNUC__ > 4 || (__GNUC__ == 4 && __GNUC_MINOR__ >= 9)) && \
+	!defined(TIFF_NO_SIMD)
+#define TIFF_F16C_SIMD
+#include <cpuid.h>
+#include <immintrin.h>
+
+/**
+Check for the F16C instructions. They are VEX-encoded, so the OS must also save the AVX register state.
+*/
+static bool
+CPUHasF16C() {
+	unsigned eax, ebx, ecx, edx, xcr0_lo, xcr0_hi;
+
+	if(!__get_cpuid(1, &eax, &ebx, &ecx, &edx)) {
+		return false;
+	}
+	if(!(ecx & bit_F16C) || !(ecx & bit_AVX) || !(ecx & bit_OSXSAVE)) {
+		return false;
+	}
+	__asm__ ("xgetbv" : "=a"(xcr0_lo), "=d"(xcr0_hi) : "c"(0));
+	return (xcr0_lo & 0x6) == 0x6;
+}
+
+/**
+Convert 8 halfs at a time with VCVTPH2PS
+*/
+__attribute__((target("avx,f16c"))) static void
+ConvertHalfToFloatF16C(float *dst, const WORD *src, unsigned count) {
+	unsigned x = 0;
+
+	for(; x + 8 <= count; x += 8) {
+		_mm256_storeu_ps(dst + x, _mm256_cvtph_ps(_mm_loadu_si128((const __m128i*)(src + x))));
+	}
+	for(half half_value; x < count; x++) {
+		half_value.setBits(src[x]);
+		dst[x] = half_value;
+	}
+}
+#endif // TIFF_F16C_SIMD
+
+/**
+Convert a line of half (16-bit) floats to float (32-bit), using F16C where the CPU has it
+*/
+static void
+ConvertHalfToFloat(float *dst, const WORD *src, unsigned count) {
+#ifdef TIFF_F16C_SIMD
+	static const bool has_f16c = CPUHasF16C();
+
+	if(has_f16c) {
+		ConvertHalfToFloatF16C(dst, src, count);
+		return;
+	}
+#endif
+	// use OpenEXR half helper class
+	half half_value;
+
+	for(unsigned x = 0; x < count; x++) {
+		half_value.setBits(src[x]);
+		dst[x] = half_value;
+	}
+}
+
 // ----------------------------------------------------------
 //   local prototypes
 // ----------------------------------------------------------
@@ -2170,18 +2237,12 @@ Load(FreeImageIO *io, fi_handle handle, int page, int flags, void *data) {
 						} 
 
 						// convert from half (16-bit) to float (32-bit)
-						// !!! use OpenEXR half helper class
-
-						half half_value;
 
 						for (uint32 l = 0; l < nrow; l++) {
 							WORD *src_pixel = (WORD*)(buf + l * src_line);
 							float *dst_pixel = (float*)bits;
 
-							for(tmsize_t x = 0; x < (tmsize_t)(src_line / sizeof(WORD)); x++) {
-								half_value.setBits(src_pixel[x]);
-								dst_pixel[x] = half_value;
-							}
+							ConvertHalfToFloat(dst_pixel, src_pixel, (unsigned)(src_line / sizeof(WORD)));
 
 							bits -= dst_pitch;
 						}
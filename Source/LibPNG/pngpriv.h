@@ -180,6 +180,47 @@
 #  endif
 #endif /* PNG_ARM_NEON_OPT > 0 */
 
+#ifndef PNG_INTEL_SSE_OPT
+   /* Intel SSE2 optimizations of the filter functions (intel/ in this tree)
+    * are used whenever the compiler is targeting SSE2, which is always the
+    * case on x86-64.  Define PNG_INTEL_SSE_OPT as 0 in CPPFLAGS to turn them
+    * off.
+    */
+#  if defined(__SSE4_1__) || defined(__AVX__) || defined(__SSSE3__) || \
+      defined(__SSE2__) || defined(_M_X64) || defined(_M_AMD64) || \
+      (defined(_M_IX86_FP) && _M_IX86_FP >= 2)
+#     define PNG_INTEL_SSE_OPT 1
+#  else
+#     define PNG_INTEL_SSE_OPT 0
+#  endif
+#endif
+
+#if PNG_INTEL_SSE_OPT > 0
+   /* PNG_INTEL_SSE_IMPLEMENTATION is the highest instruction set the compiler
+    * has been told it may use: 1 for SSE2, 2 for SSSE3 and 3 for SSE4.1.  The
+    * filter code uses a few SSSE3 and SSE4.1 instructions, if allowed, in
+    * place of short SSE2 sequences.
+    */
+#  ifndef PNG_INTEL_SSE_IMPLEMENTATION
+#     if defined(__SSE4_1__) || defined(__AVX__)
+         /* We are not actually using AVX, but checking for AVX is the best
+          * way we can detect SSE4.1 and SSSE3 on MSVC.
+          */
+#        define PNG_INTEL_SSE_IMPLEMENTATION 3
+#     elif defined(__SSSE3__)
+#        define PNG_INTEL_SSE_IMPLEMENTATION 2
+#     else
+#        define PNG_INTEL_SSE_IMPLEMENTATION 1
+#     endif
+#  endif
+
+#  if PNG_INTEL_SSE_IMPLEMENTATION > 0 && !defined(PNG_FILTER_OPTIMIZATIONS)
+#     define PNG_FILTER_OPTIMIZATIONS png_init_filter_functions_sse2
+#  endif
+#else
+#  define PNG_INTEL_SSE_IMPLEMENTATION 0
+#endif /* PNG_INTEL_SSE_OPT > 0 */
+
 /* Is this a build of a DLL where compilation of the object modules requires
  * different preprocessor settings to those required for a simple library?  If
  * so PNG_BUILD_DLL must be set.
@@ -1930,6 +1971,23 @@ PNG_INTERNAL_FUNCTION(void, PNG_FILTER_OPTIMIZATIONS, (png_structp png_ptr,
     */
 PNG_INTERNAL_FUNCTION(void, png_init_filter_functions_neon,
    (png_structp png_ptr, unsigned int bpp), PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void, png_init_filter_functions_sse2,
+   (png_structp png_ptr, unsigned int bpp), PNG_EMPTY);
+#endif
+
+#if PNG_INTEL_SSE_IMPLEMENTATION > 0
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_sub3_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_sub4_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_avg3_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_avg4_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_paeth3_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
+PNG_INTERNAL_FUNCTION(void,png_read_filter_row_paeth4_sse2,(png_row_infop
+    row_info, png_bytep row, png_const_bytep prev_row),PNG_EMPTY);
 #endif
 
 /* Maintainer: Put new private prototypes here ^ */
@@ -239,6 +239,54 @@ PredictorSetupEncode(TIFF* tif)
     case 0:  ;			\
     }
 
+/*
+ * With SSSE3, horAcc8 works on 16 bytes at a time for strides 1-4: a
+ * log-step prefix sum (shifting by stride, 2*stride, ...) accumulates each
+ * sample within the vector, and a shuffle spreads the last pixel of the
+ * previous vector across all lanes as the carry-in.
+ */
+#if defined(__GNUC__) && (defined(__x86_64__) || defined(__i386__)) && \
+    (defined(__clang__) || __GNUC__ > 4 || (__GNUC__ == 4 && __GNUC_MINOR__ >= 9)) && \
+    !defined(TIFF_NO_SIMD)
+#define PREDICT_SSSE3
+#include <tmmintrin.h>
+
+#define PSUM(n)	x = _mm_add_epi8(x, _mm_slli_si128(x, n))
+
+#define HORACC8_SSSE3_LOOP(prefix)					\
+	for (; cc >= 16; cc -= 16, cp += 16) {				\
+		__m128i x = _mm_loadu_si128((const __m128i*) cp);	\
+		prefix;							\
+		x = _mm_add_epi8(x, _mm_shuffle_epi8(prev, carry));	\
+		_mm_storeu_si128((__m128i*) cp, x);			\
+		prev = x;						\
+	}
+
+__attribute__((target("ssse3"))) static void
+horAcc8SSSE3(uint8* cp, tmsize_t cc, tmsize_t stride)
+{
+	uint8 shuffle[16];
+	__m128i prev = _mm_setzero_si128();
+	__m128i carry;
+	int i;
+
+	/* lane i takes the running sum of its sample from the previous vector */
+	for (i = 0; i < 16; i++)
+		shuffle[i] = (uint8) (16 - stride + i % stride);
+	carry = _mm_loadu_si128((const __m128i*) shuffle);
+
+	switch (stride) {
+	case 1:  HORACC8_SSSE3_LOOP(PSUM(1); PSUM(2); PSUM(4); PSUM(8)) break;
+	case 2:  HORACC8_SSSE3_LOOP(PSUM(2); PSUM(4); PSUM(8)) break;
+	case 3:  HORACC8_SSSE3_LOOP(PSUM(3); PSUM(6); PSUM(12)) break;
+	default: HORACC8_SSSE3_LOOP(PSUM(4); PSUM(8)) break;
+	}
+
+	for (; cc > 0; cc--, cp++)
+		cp[0] = (uint8) (cp[0] + cp[-stride]);
+}
+#endif /* PREDICT_SSSE3 */
+
 static void
 horAcc8(TIFF* tif, uint8* cp0, tmsize_t cc)
 {
@@ -246,6 +294,12 @@ horAcc8(TIFF* tif, uint8* cp0, tmsize_t cc)
 
 	char* cp = (char*) cp0;
 	assert((cc%stride)==0);
+#ifdef PREDICT_SSSE3
+	if (stride <= 4 && cc >= 32 && __builtin_cpu_supports("ssse3")) {
+		horAcc8SSSE3(cp0, cc, stride);
+		return;
+	}
+#endif
 	if (cc > stride) {
 		/*
 		 * Pipeline the most common cases.
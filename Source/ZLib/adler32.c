@@ -6,6 +6,7 @@
 /* @(#) $Id: adler32.c,v 1.10 2013/05/10 17:22:51 drolon Exp $ */
 
 #include "zutil.h"
+#include "adler32_simd.h"
 
 #define local static
 
@@ -70,6 +71,14 @@ uLong ZEXPORT adler32(adler, buf, len)
     unsigned long sum2;
     unsigned n;
 
+#ifdef X86_SIMD
+    if (buf != Z_NULL && len >= ADLER32_SIMD_MIN_LEN) {
+        cpu_check_features();
+        if (x86_cpu_has_ssse3)
+            return adler32_simd(adler, buf, len);
+    }
+#endif /* X86_SIMD */
+
     /* split Adler-32 into component sums */
     sum2 = (adler >> 16) & 0xffff;
     adler &= 0xffff;
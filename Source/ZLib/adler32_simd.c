@@ -0,0 +1,103 @@
+/* adler32_simd.c -- Adler-32 checksum with SSSE3 vector sums
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ *
+ * For a block of n bytes b[0..n-1], the Adler-32 sums advance as
+ *
+ *   s1' = s1 + sum(b[i])
+ *   s2' = s2 + n*s1 + sum((n - i) * b[i])
+ *
+ * so each 32-byte block needs one plain byte sum (PSADBW against zero) and
+ * one weighted sum with weights 32..1 (PMADDUBSW, then PMADDWD to widen).
+ * The n*s1 term is accumulated as the running total of s1 at the start of
+ * each block, times 32. Blocks are processed in runs of at most NMAX bytes,
+ * as in adler32.c, so that the 32-bit sums cannot overflow before the
+ * modulo reduction.
+ */
+
+#include "adler32_simd.h"
+
+#ifdef X86_SIMD
+
+#include <tmmintrin.h>
+
+#define BASE 65521      /* largest prime smaller than 65536 */
+#define NMAX 5552
+/* NMAX is the largest n such that 255n(n+1)/2 + (n+1)(BASE-1) <= 2^32-1 */
+
+#define BLOCK_SIZE 32
+
+__attribute__((target("ssse3")))
+uLong ZLIB_INTERNAL adler32_simd(adler, buf, len)
+    uLong adler;
+    const Bytef *buf;
+    uInt len;
+{
+    unsigned s1 = adler & 0xffff;
+    unsigned s2 = (adler >> 16) & 0xffff;
+    unsigned blocks = len / BLOCK_SIZE;
+
+    const __m128i tap1 = _mm_setr_epi8(32, 31, 30, 29, 28, 27, 26, 25,
+                                       24, 23, 22, 21, 20, 19, 18, 17);
+    const __m128i tap2 = _mm_setr_epi8(16, 15, 14, 13, 12, 11, 10, 9,
+                                        8,  7,  6,  5,  4,  3,  2, 1);
+    const __m128i zero = _mm_setzero_si128();
+    const __m128i ones = _mm_set1_epi16(1);
+
+    len -= blocks * BLOCK_SIZE;
+
+    while (blocks) {
+        unsigned n = NMAX / BLOCK_SIZE;
+        __m128i v_ps, v_s1, v_s2;
+
+        if (n > blocks)
+            n = blocks;
+        blocks -= n;
+
+        v_ps = _mm_set_epi32(0, 0, 0, (int)(s1 * n));
+        v_s2 = _mm_set_epi32(0, 0, 0, (int)s2);
+        v_s1 = _mm_setzero_si128();
+
+        do {
+            const __m128i bytes1 = _mm_loadu_si128((const __m128i *)buf);
+            const __m128i bytes2 = _mm_loadu_si128((const __m128i *)(buf + 16));
+
+            /* Sum of s1 at the start of each block, for the n*s1 term. */
+            v_ps = _mm_add_epi32(v_ps, v_s1);
+
+            v_s1 = _mm_add_epi32(v_s1, _mm_sad_epu8(bytes1, zero));
+            v_s2 = _mm_add_epi32(v_s2, _mm_madd_epi16(
+                       _mm_maddubs_epi16(bytes1, tap1), ones));
+            v_s1 = _mm_add_epi32(v_s1, _mm_sad_epu8(bytes2, zero));
+            v_s2 = _mm_add_epi32(v_s2, _mm_madd_epi16(
+                       _mm_maddubs_epi16(bytes2, tap2), ones));
+
+            buf += BLOCK_SIZE;
+        } while (--n);
+
+        v_s2 = _mm_add_epi32(v_s2, _mm_slli_epi32(v_ps, 5));
+
+        /* Add up the lanes: PSADBW leaves its sums in lanes 0 and 2. */
+        v_s1 = _mm_add_epi32(v_s1, _mm_shuffle_epi32(v_s1, _MM_SHUFFLE(1, 0, 3, 2)));
+        s1 += (unsigned)_mm_cvtsi128_si32(v_s1);
+        v_s2 = _mm_add_epi32(v_s2, _mm_shuffle_epi32(v_s2, _MM_SHUFFLE(2, 3, 0, 1)));
+        v_s2 = _mm_add_epi32(v_s2, _mm_shuffle_epi32(v_s2, _MM_SHUFFLE(1, 0, 3, 2)));
+        s2 = (unsigned)_mm_cvtsi128_si32(v_s2);
+
+        s1 %= BASE;
+        s2 %= BASE;
+    }
+
+    /* Fewer than BLOCK_SIZE bytes remain. */
+    if (len) {
+        while (len--) {
+            s1 += *buf++;
+            s2 += s1;
+        }
+        s1 %= BASE;
+        s2 %= BASE;
+    }
+
+    return s1 | ((uLong)s2 << 16);
+}
+
+#endif /* X86_SIMD */
@@ -0,0 +1,20 @@
+/* adler32_simd.h -- Adler-32 checksum with SSSE3 vector sums
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ */
+
+#ifndef ADLER32_SIMD_H
+#define ADLER32_SIMD_H
+
+#include "cpu_features.h"
+
+#ifdef X86_SIMD
+/* Below this length the scalar code is as fast. */
+#  define ADLER32_SIMD_MIN_LEN 64
+
+/* Update adler with len bytes of buf. Callers must check that
+   x86_cpu_has_ssse3 is set. */
+uLong ZLIB_INTERNAL adler32_simd OF((uLong adler, const Bytef *buf,
+                                     uInt len));
+#endif /* X86_SIMD */
+
+#endif /* ADLER32_SIMD_H */
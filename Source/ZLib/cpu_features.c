@@ -0,0 +1,55 @@
+/* cpu_features.c -- run-time detection of SIMD instruction set extensions
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ */
+
+#include "cpu_features.h"
+
+#ifdef X86_SIMD
+
+#include <cpuid.h>
+
+int ZLIB_INTERNAL x86_cpu_has_ssse3 = 0;
+int ZLIB_INTERNAL x86_cpu_has_pclmul = 0;
+int ZLIB_INTERNAL x86_cpu_has_avx512_clmul = 0;
+
+local volatile int cpu_features_checked = 0;
+
+/* Return the XCR0 register: which vector register state the OS preserves. */
+local unsigned long long xgetbv0 OF((void));
+local unsigned long long xgetbv0()
+{
+    unsigned int eax, edx;
+
+    __asm__ __volatile__ ("xgetbv" : "=a" (eax), "=d" (edx) : "c" (0));
+    return ((unsigned long long)edx << 32) | eax;
+}
+
+void ZLIB_INTERNAL cpu_check_features()
+{
+    unsigned int eax, ebx, ecx, edx;
+    unsigned int max_leaf;
+    int has_avx512 = 0;
+
+    if (cpu_features_checked)
+        return;
+
+    max_leaf = __get_cpuid_max(0, Z_NULL);
+    if (max_leaf >= 1) {
+        __cpuid(1, eax, ebx, ecx, edx);
+        x86_cpu_has_ssse3 = (edx & bit_SSE2) && (ecx & bit_SSSE3);
+        x86_cpu_has_pclmul = x86_cpu_has_ssse3 && (ecx & bit_SSE4_1) &&
+                             (ecx & bit_PCLMUL);
+        /* AVX-512 needs the OS to save the opmask and all 32 zmm registers:
+           XCR0 bits 1, 2 (SSE, AVX) and 5, 6, 7 (opmask, zmm0-15, zmm16-31). */
+        if ((ecx & bit_OSXSAVE) && (xgetbv0() & 0xe6) == 0xe6)
+            has_avx512 = 1;
+    }
+    if (max_leaf >= 7 && has_avx512 && x86_cpu_has_pclmul) {
+        __cpuid_count(7, 0, eax, ebx, ecx, edx);
+        x86_cpu_has_avx512_clmul = (ebx & (1U << 16)) &&  /* AVX512F */
+                                   (ecx & (1U << 10));    /* VPCLMULQDQ */
+    }
+    cpu_features_checked = 1;
+}
+
+#endif /* X86_SIMD */
@@ -0,0 +1,39 @@
+/* cpu_features.h -- run-time detection of SIMD instruction set extensions
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ */
+
+#ifndef CPU_FEATURES_H
+#define CPU_FEATURES_H
+
+#include "zutil.h"
+
+/* The SIMD code paths use GCC/clang function target attributes, so that no
+   special compiler flags are needed and the rest of the library still runs on
+   any x86 CPU: the vector code is only called after checking the CPU here.
+   Define Z_NO_SIMD to leave it all out, or Z_NO_AVX512 for just the AVX-512
+   code paths. */
+#if (defined(__x86_64__) || defined(__i386__)) && !defined(Z_NO_SIMD) && \
+    (defined(__clang__) || \
+     (defined(__GNUC__) && (__GNUC__ > 4 || \
+                            (__GNUC__ == 4 && __GNUC_MINOR__ >= 9))))
+#  define X86_SIMD
+#endif
+
+#ifdef X86_SIMD
+/* Encoders for AVX-512 and VPCLMULQDQ arrived in GCC 8 and clang 6. */
+#  if !defined(Z_NO_AVX512) && \
+      ((defined(__clang__) && __clang_major__ >= 6) || \
+       (!defined(__clang__) && __GNUC__ >= 8))
+#    define X86_AVX512_SIMD
+#  endif
+
+extern int ZLIB_INTERNAL x86_cpu_has_ssse3;
+extern int ZLIB_INTERNAL x86_cpu_has_pclmul;     /* with SSE4.1 */
+extern int ZLIB_INTERNAL x86_cpu_has_avx512_clmul; /* AVX512F+VPCLMULQDQ */
+
+/* Fill in the x86_cpu_has_* flags. Does the CPUID checks only once; it is
+   safe, if redundant, for several threads to call this at once. */
+void ZLIB_INTERNAL cpu_check_features OF((void));
+#endif /* X86_SIMD */
+
+#endif /* CPU_FEATURES_H */
@@ -29,6 +29,7 @@
 #endif /* MAKECRCH */
 
 #include "zutil.h"      /* for STDC and FAR definitions */
+#include "crc32_simd.h"
 
 #define local static
 
@@ -213,6 +214,22 @@ unsigned long ZEXPORT crc32(crc, buf, len)
         make_crc_table();
 #endif /* DYNAMIC_CRC_TABLE */
 
+#ifdef X86_SIMD
+    if (len >= CRC32_SIMD_MIN_LEN) {
+        cpu_check_features();
+        if (x86_cpu_has_pclmul) {
+            uInt chunk = len & ~(uInt)CRC32_SIMD_CHUNK_MASK;
+
+            crc = ~(unsigned long)crc32_simd((z_crc_t)~crc, buf, chunk) &
+                  0xffffffffUL;
+            buf += chunk;
+            len -= chunk;
+            if (len == 0)
+                return crc;
+        }
+    }
+#endif /* X86_SIMD */
+
 #ifdef BYFOUR
     if (sizeof(void *) == sizeof(ptrdiff_t)) {
         z_crc_t endian;
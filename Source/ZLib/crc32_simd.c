@@ -0,0 +1,209 @@
+/* crc32_simd.c -- CRC-32 by folding with carry-less multiplication
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ *
+ * The algorithm is from "Fast CRC Computation for Generic Polynomials Using
+ * PCLMULQDQ Instruction", V. Gopal, E. Ozturk, et al., Intel, 2009: the
+ * buffer is consumed as 128-bit lanes, each of which is repeatedly "folded"
+ * forward over the lanes that follow it by carry-less multiplication with a
+ * constant x^n mod P, and the final 128 bits are Barrett-reduced to the CRC.
+ * With AVX-512 and VPCLMULQDQ, four 512-bit registers (16 lanes) are folded at
+ * once, which keeps the multipliers busy rather than waiting on loads.
+ *
+ * The fold constants for a distance of D bits are, in the bit-reflected
+ * domain of the CRC, k = reflect32(x^(D+32) mod P) << 1 for the low and
+ * reflect32(x^(D-32) mod P) << 1 for the high 64 bits of each lane.
+ */
+
+#include "crc32_simd.h"
+
+#ifdef X86_SIMD
+
+#include <immintrin.h>
+
+#define zalign(x) __attribute__((aligned(x)))
+#define TARGET_PCLMUL __attribute__((target("sse4.1,pclmul")))
+#define TARGET_AVX512_CLMUL \
+    __attribute__((target("sse4.1,pclmul,avx512f,vpclmulqdq")))
+
+/* Fold constants for distances of 512 and 128 bits, the x^64 constant for
+   128->64 bit folding, and the Barrett constants P' and mu for 64->32. */
+local const unsigned long long zalign(16) k1k2[] =
+    { 0x0154442bd4ULL, 0x01c6e41596ULL };
+local const unsigned long long zalign(16) k3k4[] =
+    { 0x01751997d0ULL, 0x00ccaa009eULL };
+local const unsigned long long zalign(16) k5k0[] =
+    { 0x0163cd6124ULL, 0x0000000000ULL };
+local const unsigned long long zalign(16) poly[] =
+    { 0x01db710641ULL, 0x01f7011641ULL };
+
+/* Multiply both halves of lane x by the fold constants k, and add in data. */
+local TARGET_PCLMUL __m128i fold_128(__m128i x, __m128i k, __m128i data)
+{
+    __m128i lo = _mm_clmulepi64_si128(x, k, 0x00);
+    __m128i hi = _mm_clmulepi64_si128(x, k, 0x11);
+    return _mm_xor_si128(_mm_xor_si128(hi, lo), data);
+}
+
+/* Fold any remaining 16-byte blocks of buf into x1, then reduce it to the
+   32-bit CRC. */
+local TARGET_PCLMUL z_crc_t crc32_fold_finish(__m128i x1,
+                                              const unsigned char FAR *buf,
+                                              uInt len)
+{
+    __m128i x0, x2, x3;
+
+    x0 = _mm_load_si128((const __m128i *)k3k4);
+    while (len >= 16) {
+        x1 = fold_128(x1, x0, _mm_loadu_si128((const __m128i *)buf));
+        buf += 16;
+        len -= 16;
+    }
+
+    /* Fold 128 bits to 64 bits. */
+    x2 = _mm_clmulepi64_si128(x1, x0, 0x10);
+    x3 = _mm_setr_epi32(~0, 0, ~0, 0);
+    x1 = _mm_srli_si128(x1, 8);
+    x1 = _mm_xor_si128(x1, x2);
+
+    x0 = _mm_loadl_epi64((const __m128i *)k5k0);
+
+    x2 = _mm_srli_si128(x1, 4);
+    x1 = _mm_and_si128(x1, x3);
+    x1 = _mm_clmulepi64_si128(x1, x0, 0x00);
+    x1 = _mm_xor_si128(x1, x2);
+
+    /* Barrett reduce to 32 bits. */
+    x0 = _mm_load_si128((const __m128i *)poly);
+
+    x2 = _mm_and_si128(x1, x3);
+    x2 = _mm_clmulepi64_si128(x2, x0, 0x10);
+    x2 = _mm_and_si128(x2, x3);
+    x2 = _mm_clmulepi64_si128(x2, x0, 0x00);
+    x1 = _mm_xor_si128(x1, x2);
+
+    return (z_crc_t)(unsigned)_mm_extract_epi32(x1, 1);
+}
+
+/* SSE4.1 and PCLMULQDQ: fold four 128-bit lanes, 64 bytes at a time. */
+local TARGET_PCLMUL z_crc_t crc32_pclmul(z_crc_t crc,
+                                         const unsigned char FAR *buf,
+                                         uInt len)
+{
+    __m128i x0, x1, x2, x3, x4;
+
+    x1 = _mm_loadu_si128((const __m128i *)(buf + 0x00));
+    x2 = _mm_loadu_si128((const __m128i *)(buf + 0x10));
+    x3 = _mm_loadu_si128((const __m128i *)(buf + 0x20));
+    x4 = _mm_loadu_si128((const __m128i *)(buf + 0x30));
+
+    x1 = _mm_xor_si128(x1, _mm_cvtsi32_si128((int)crc));
+
+    x0 = _mm_load_si128((const __m128i *)k1k2);
+
+    buf += 64;
+    len -= 64;
+
+    while (len >= 64) {
+        x1 = fold_128(x1, x0, _mm_loadu_si128((const __m128i *)(buf + 0x00)));
+        x2 = fold_128(x2, x0, _mm_loadu_si128((const __m128i *)(buf + 0x10)));
+        x3 = fold_128(x3, x0, _mm_loadu_si128((const __m128i *)(buf + 0x20)));
+        x4 = fold_128(x4, x0, _mm_loadu_si128((const __m128i *)(buf + 0x30)));
+
+        buf += 64;
+        len -= 64;
+    }
+
+    /* Fold the four lanes into one. */
+    x0 = _mm_load_si128((const __m128i *)k3k4);
+    x1 = fold_128(x1, x0, x2);
+    x1 = fold_128(x1, x0, x3);
+    x1 = fold_128(x1, x0, x4);
+
+    return crc32_fold_finish(x1, buf, len);
+}
+
+#ifdef X86_AVX512_SIMD
+
+/* Fold constants for a distance of 2048 bits (four 512-bit registers). */
+local const unsigned long long zalign(16) k2048[] =
+    { 0x011542778aULL, 0x01322d1430ULL };
+
+local TARGET_AVX512_CLMUL __m512i fold_512(__m512i x, __m512i k, __m512i data)
+{
+    __m512i lo = _mm512_clmulepi64_epi128(x, k, 0x00);
+    __m512i hi = _mm512_clmulepi64_epi128(x, k, 0x11);
+    return _mm512_ternarylogic_epi64(lo, hi, data, 0x96); /* lo ^ hi ^ data */
+}
+
+/* AVX-512 and VPCLMULQDQ: fold sixteen 128-bit lanes, 256 bytes at a time. */
+local TARGET_AVX512_CLMUL z_crc_t crc32_avx512_clmul(z_crc_t crc,
+                                                    const unsigned char FAR *buf,
+                                                    uInt len)
+{
+    __m512i k, x1, x2, x3, x4;
+    __m128i k128, y;
+
+    if (len < 256)
+        return crc32_pclmul(crc, buf, len);
+
+    x1 = _mm512_loadu_si512((const void *)(buf + 0x00));
+    x2 = _mm512_loadu_si512((const void *)(buf + 0x40));
+    x3 = _mm512_loadu_si512((const void *)(buf + 0x80));
+    x4 = _mm512_loadu_si512((const void *)(buf + 0xc0));
+
+    x1 = _mm512_xor_si512(x1, _mm512_inserti32x4(_mm512_setzero_si512(),
+                                                 _mm_cvtsi32_si128((int)crc),
+                                                 0));
+
+    k = _mm512_broadcast_i32x4(_mm_load_si128((const __m128i *)k2048));
+
+    buf += 256;
+    len -= 256;
+
+    while (len >= 256) {
+        x1 = fold_512(x1, k, _mm512_loadu_si512((const void *)(buf + 0x00)));
+        x2 = fold_512(x2, k, _mm512_loadu_si512((const void *)(buf + 0x40)));
+        x3 = fold_512(x3, k, _mm512_loadu_si512((const void *)(buf + 0x80)));
+        x4 = fold_512(x4, k, _mm512_loadu_si512((const void *)(buf + 0xc0)));
+
+        buf += 256;
+        len -= 256;
+    }
+
+    /* Fold the four registers into one, then any remaining 64-byte blocks. */
+    k = _mm512_broadcast_i32x4(_mm_load_si128((const __m128i *)k1k2));
+    x1 = fold_512(x1, k, x2);
+    x1 = fold_512(x1, k, x3);
+    x1 = fold_512(x1, k, x4);
+
+    while (len >= 64) {
+        x1 = fold_512(x1, k, _mm512_loadu_si512((const void *)buf));
+        buf += 64;
+        len -= 64;
+    }
+
+    /* Fold the four lanes of the register into one. */
+    k128 = _mm_load_si128((const __m128i *)k3k4);
+    y = _mm512_extracti32x4_epi32(x1, 0);
+    y = fold_128(y, k128, _mm512_extracti32x4_epi32(x1, 1));
+    y = fold_128(y, k128, _mm512_extracti32x4_epi32(x1, 2));
+    y = fold_128(y, k128, _mm512_extracti32x4_epi32(x1, 3));
+
+    return crc32_fold_finish(y, buf, len);
+}
+
+#endif /* X86_AVX512_SIMD */
+
+z_crc_t ZLIB_INTERNAL crc32_simd(crc, buf, len)
+    z_crc_t crc;
+    const unsigned char FAR *buf;
+    uInt len;
+{
+#ifdef X86_AVX512_SIMD
+    if (x86_cpu_has_avx512_clmul)
+        return crc32_avx512_clmul(crc, buf, len);
+#endif
+    return crc32_pclmul(crc, buf, len);
+}
+
+#endif /* X86_SIMD */
@@ -0,0 +1,23 @@
+/* crc32_simd.h -- CRC-32 by folding with carry-less multiplication
+ * For conditions of distribution and use, see copyright notice in zlib.h
+ */
+
+#ifndef CRC32_SIMD_H
+#define CRC32_SIMD_H
+
+#include "cpu_features.h"
+
+#ifdef X86_SIMD
+/* The folding code takes buffers of at least CRC32_SIMD_MIN_LEN bytes, in
+   whole 16-byte blocks; crc32() handles any remaining bytes. */
+#  define CRC32_SIMD_MIN_LEN 64
+#  define CRC32_SIMD_CHUNK_MASK 15
+
+/* Update a pre- and post-conditioned (i.e. bit-inverted) CRC with len bytes
+   of buf, using the fastest folding code this CPU supports. Callers must
+   check that x86_cpu_has_pclmul is set. */
+z_crc_t ZLIB_INTERNAL crc32_simd OF((z_crc_t crc, const unsigned char FAR *buf,
+                                     uInt len));
+#endif /* X86_SIMD */
+
+#endif /* CRC32_SIMD_H */
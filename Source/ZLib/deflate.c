@@ -92,6 +92,14 @@ local int read_buf        OF((z_streamp strm, Bytef *buf, unsigned size));
 local uInt longest_match  OF((deflate_state *s, IPos cur_match));
 #endif
 
+/* With GCC or clang on a little-endian target, longest_match() compares
+ * strings eight bytes at a time. Define NO_WORD_MATCH to compare bytes.
+ */
+#if !defined(NO_WORD_MATCH) && defined(__GNUC__) && \
+    defined(__BYTE_ORDER__) && __BYTE_ORDER__ == __ORDER_LITTLE_ENDIAN__
+#  define WORD_MATCH
+#endif
+
 #ifdef DEBUG
 local  void check_match OF((deflate_state *s, IPos start, IPos match,
                             int length));
@@ -1253,6 +1261,27 @@ local uInt longest_match(s, cur_match)
         scan += 2, match++;
         Assert(*scan == *match, "match[2]?");
 
+#ifdef WORD_MATCH
+        /* Compare eight bytes at a time from strstart+3, and locate the
+         * first differing byte from the lowest set bit of the difference.
+         * The 32nd word ends at strstart+258, as for the loop below.
+         */
+        scan++, match++;
+        do {
+            unsigned long long scan_word, match_word, diff;
+
+            zmemcpy(&scan_word, scan, sizeof(scan_word));
+            zmemcpy(&match_word, match, sizeof(match_word));
+            diff = scan_word ^ match_word;
+            if (diff != 0) {
+                scan += __builtin_ctzll(diff) >> 3;
+                break;
+            }
+            scan += 8, match += 8;
+        } while (scan < strend);
+        /* A match running through strstart+258 leaves scan one past it. */
+        if (scan > strend) scan = strend;
+#else
         /* We check for insufficient lookahead only every 8th comparison;
          * the 256th check will be made at strstart+258.
          */
@@ -1262,6 +1291,7 @@ local uInt longest_match(s, cur_match)
                  *++scan == *++match && *++scan == *++match &&
                  *++scan == *++match && *++scan == *++match &&
                  scan < strend);
+#endif /* WORD_MATCH */
 
         Assert(scan <= s->window+(unsigned)(s->window_size-1), "wild scan");
 
@@ -29,6 +29,49 @@
 #  define PUP(a) *++(a)
 #endif
 
+/* Copy len bytes from dist bytes back in the output to out, where out is
+   offset by OFF as for PUP(), and return the updated out.  When dist < len,
+   the match overlaps the bytes it is producing, so the bytes already
+   produced are repeated: each zmemcpy() copies all of the output since the
+   start of the source, which doubles in length every time and never
+   overlaps its destination.  Short matches are copied a byte at a time. */
+local unsigned char FAR *copy_from_output OF((unsigned char FAR *out,
+                                              unsigned dist, unsigned len));
+local unsigned char FAR *copy_from_output(out, dist, len)
+unsigned char FAR *out;
+unsigned dist;
+unsigned len;
+{
+    unsigned char FAR *to = out + OFF;
+    unsigned char FAR *from = to - dist;
+    unsigned run;
+
+    if (len < 8) {
+        do {
+            *to++ = *from++;
+        } while (--len);
+        return to - OFF;
+    }
+    run = dist;
+    while (len > run) {
+        zmemcpy(to, from, run);
+        to += run;
+        len -= run;
+        run = (unsigned)(to - from);
+    }
+    zmemcpy(to, from, len);
+    return to + len - OFF;
+}
+
+/* Copy n bytes from from to out, which are offset by OFF as for PUP(), and
+   advance both; for copies out of the window, which can not overlap. */
+#define WINDOW_COPY(n) \
+    do { \
+        zmemcpy(out + OFF, from + OFF, n); \
+        out += n; \
+        from += n; \
+    } while (0)
+
 /*
    Decode literal, length, and distance codes and write out the resulting
    literal and match bytes until either not enough input or output is
@@ -218,10 +261,9 @@ unsigned start;         /* inflate()'s starting value for strm->avail_out */
                         from += wsize - op;
                         if (op < len) {         /* some from window */
                             len -= op;
-                            do {
-                                PUP(out) = PUP(from);
-                            } while (--op);
-                            from = out - dist;  /* rest from output */
+                            WINDOW_COPY(op);
+                            out = copy_from_output(out, dist, len);
+                            continue;           /* rest from output */
                         }
                     }
                     else if (wnext < op) {      /* wrap around window */
@@ -229,17 +271,14 @@ unsigned start;         /* inflate()'s starting value for strm->avail_out */
                         op -= wnext;
                         if (op < len) {         /* some from end of window */
                             len -= op;
-                            do {
-                                PUP(out) = PUP(from);
-                            } while (--op);
+                            WINDOW_COPY(op);
                             from = window - OFF;
                             if (wnext < len) {  /* some from start of window */
                                 op = wnext;
                                 len -= op;
-                                do {
-                                    PUP(out) = PUP(from);
-                                } while (--op);
-                                from = out - dist;      /* rest from output */
+                                WINDOW_COPY(op);
+                                out = copy_from_output(out, dist, len);
+                                continue;       /* rest from output */
                             }
                         }
                     }
@@ -247,37 +286,16 @@ unsigned start;         /* inflate()'s starting value for strm->avail_out */
                         from += wnext - op;
                         if (op < len) {         /* some from window */
                             len -= op;
-                            do {
-                                PUP(out) = PUP(from);
-                            } while (--op);
-                            from = out - dist;  /* rest from output */
+                            WINDOW_COPY(op);
+                            out = copy_from_output(out, dist, len);
+                            continue;           /* rest from output */
                         }
                     }
-                    while (len > 2) {
-                        PUP(out) = PUP(from);
-                        PUP(out) = PUP(from);
-                        PUP(out) = PUP(from);
-                        len -= 3;
-                    }
-                    if (len) {
-                        PUP(out) = PUP(from);
-                        if (len > 1)
-                            PUP(out) = PUP(from);
-                    }
+                    WINDOW_COPY(len);           /* all from window */
                 }
                 else {
-                    from = out - dist;          /* copy direct from output */
-                    do {                        /* minimum length is three */
-                        PUP(out) = PUP(from);
-                        PUP(out) = PUP(from);
-                        PUP(out) = PUP(from);
-                        len -= 3;
-                    } while (len > 2);
-                    if (len) {
-                        PUP(out) = PUP(from);
-                        if (len > 1)
-                            PUP(out) = PUP(from);
-                    }
+                    /* copy direct from output */
+                    out = copy_from_output(out, dist, len);
                 }
             }
             else if ((op & 64) == 0) {          /* 2nd level distance code */
@@ -1,5 +1,13 @@
 #include <Python.h>
 
+/* setup.py compiles with -fvisibility=hidden, so make sure that the module
+   init function is exported even where PyMODINIT_FUNC doesn't say so. */
+#if defined(__GNUC__)
+#define FI_MODINIT_FUNC __attribute__((visibility("default"))) PyMODINIT_FUNC
+#else
+#define FI_MODINIT_FUNC PyMODINIT_FUNC
+#endif
+
 static PyMethodDef NoMethods[] =
 {
      {NULL, NULL, 0, NULL}
@@ -8,7 +16,7 @@ static PyMethodDef NoMethods[] =
 
 #if PY_MAJOR_VERSION < 3
 
-PyMODINIT_FUNC
+FI_MODINIT_FUNC
 init_freeimage(void)
 {
     Py_InitModule("_freeimage", NoMethods);
@@ -24,7 +32,7 @@ static struct PyModuleDef freeimagemodule = {
    NoMethods
 };
 
-PyMODINIT_FUNC
+FI_MODINIT_FUNC
 PyInit__freeimage(void)
 {
     return PyModule_Create(&freeimagemodule);
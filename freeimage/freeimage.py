@@ -23,14 +23,23 @@
 # Authors: Zach Pincus
 
 import ctypes
+import functools
 import numpy
 import sys
 import os.path
 import glob
+import multiprocessing
 from numpy.compat import asbytes, asstr
 
-__all__ = ['read', 'read_multipage', 'read_metadata', 'read_multipage_metadata',
-    'write', 'write_multipage', 'IO_FLAGS', 'METADATA_MODELS']
+try:
+    from concurrent import futures
+except ImportError:
+    # Python 2 without the 'futures' backport
+    futures = None
+
+__all__ = ['read', 'read_many', 'read_multipage', 'read_metadata',
+    'read_multipage_metadata', 'write', 'write_multipage', 'IO_FLAGS',
+    'METADATA_MODELS']
 
 
 def load_freeimage():
@@ -77,27 +86,74 @@ def load_freeimage():
 
 _FI = load_freeimage()
 
-API = {
-    # All we're doing here is telling ctypes that some of the FreeImage
-    # functions return pointers instead of integers. (On 64-bit systems,
-    # without this information the pointers get truncated and crashes result).
-    # There's no need to list functions that return ints, or the types of the
-    # parameters to these or other functions -- that's fine to do implicitly.
 
-    # Note that the ctypes immediately converts the returned void_p back to a
+class _Handle(ctypes.c_void_p):
+    """Pointer type for FreeImage handles (bitmaps, multibitmaps, metadata
+    searches, palettes) that are passed back into the library. Unlike a
+    plain c_void_p restype, which ctypes converts to a python int, instances
+    of a c_void_p subclass are returned to python as-is.
+    """
+
+_VOIDP = ctypes.c_void_p
+_VOIDPP = ctypes.POINTER(ctypes.c_void_p)
+
+API = {
+    # Here we tell ctypes the return and parameter types of every FreeImage
+    # function that we call. Most importantly, some of the functions return
+    # pointers instead of integers. (On 64-bit systems, without this
+    # information the pointers get truncated and crashes result). Giving the
+    # parameter types as well means that ctypes always passes handles as
+    # full-width pointers, and that it knows up front how to convert each
+    # argument instead of working that out anew on every call.
+
+    # Note that the ctypes immediately converts a returned c_void_p back to a
     # python int again! This is really not helpful, because then passing it
     # back to another library call will cause truncation-to-32-bits on 64-bit
-    # systems. Thanks, ctypes! So after these calls one must immediately
-    # re-wrap the int as a c_void_p if it is to be passed back into FreeImage.
-    'FreeImage_AllocateT': (ctypes.c_void_p, None),
-    'FreeImage_FindFirstMetadata': (ctypes.c_void_p, None),
-    'FreeImage_GetBits': (ctypes.c_void_p, None),
-    'FreeImage_GetPalette': (ctypes.c_void_p, None),
-    'FreeImage_GetTagKey': (ctypes.c_char_p, None),
-    'FreeImage_GetTagValue': (ctypes.c_void_p, None),
-    'FreeImage_Load': (ctypes.c_void_p, None),
-    'FreeImage_LockPage': (ctypes.c_void_p, None),
-    'FreeImage_OpenMultiBitmap': (ctypes.c_void_p, None)
+    # systems. Thanks, ctypes! So functions returning a handle that will be
+    # passed back into FreeImage use the _Handle subclass instead, which ctypes
+    # leaves wrapped. Plain c_void_p is fine for pointers to data that are only
+    # used as addresses from python.
+    'FreeImage_AllocateT': (_Handle, [ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                      ctypes.c_int, ctypes.c_uint, ctypes.c_uint,
+                                      ctypes.c_uint]),
+    'FreeImage_AppendPage': (None, [_VOIDP, _VOIDP]),
+    'FreeImage_CloseMultiBitmap': (ctypes.c_int, [_VOIDP, ctypes.c_int]),
+    'FreeImage_FindCloseMetadata': (None, [_VOIDP]),
+    'FreeImage_FindFirstMetadata': (_Handle, [ctypes.c_int, _VOIDP, _VOIDPP]),
+    'FreeImage_ConvertToRawBits': (None, [_VOIDP, _VOIDP, ctypes.c_int,
+                                          ctypes.c_uint, ctypes.c_uint,
+                                          ctypes.c_uint, ctypes.c_uint,
+                                          ctypes.c_int]),
+    'FreeImage_FIFSupportsExportBPP': (ctypes.c_int, [ctypes.c_int, ctypes.c_int]),
+    'FreeImage_FIFSupportsExportType': (ctypes.c_int, [ctypes.c_int, ctypes.c_int]),
+    'FreeImage_FindNextMetadata': (ctypes.c_int, [_VOIDP, _VOIDPP]),
+    'FreeImage_GetBPP': (ctypes.c_uint, [_VOIDP]),
+    'FreeImage_GetBits': (ctypes.c_void_p, [_VOIDP]),
+    'FreeImage_GetFIFCount': (ctypes.c_int, []),
+    'FreeImage_GetFIFExtensionList': (ctypes.c_char_p, [ctypes.c_int]),
+    'FreeImage_GetFileType': (ctypes.c_int, [ctypes.c_char_p, ctypes.c_int]),
+    'FreeImage_GetFormatFromFIF': (ctypes.c_char_p, [ctypes.c_int]),
+    'FreeImage_GetHeight': (ctypes.c_uint, [_VOIDP]),
+    'FreeImage_GetImageType': (ctypes.c_int, [_VOIDP]),
+    'FreeImage_GetPageCount': (ctypes.c_int, [_VOIDP]),
+    'FreeImage_GetPalette': (_Handle, [_VOIDP]),
+    'FreeImage_GetPitch': (ctypes.c_uint, [_VOIDP]),
+    'FreeImage_GetTagKey': (ctypes.c_char_p, [_VOIDP]),
+    'FreeImage_GetTagLength': (ctypes.c_uint32, [_VOIDP]),
+    'FreeImage_GetTagType': (ctypes.c_int, [_VOIDP]),
+    'FreeImage_GetTagValue': (ctypes.c_void_p, [_VOIDP]),
+    'FreeImage_GetWidth': (ctypes.c_uint, [_VOIDP]),
+    'FreeImage_IsLittleEndian': (ctypes.c_int, []),
+    'FreeImage_IsPluginEnabled': (ctypes.c_int, [ctypes.c_int]),
+    'FreeImage_Load': (_Handle, [ctypes.c_int, ctypes.c_char_p, ctypes.c_int]),
+    'FreeImage_LockPage': (_Handle, [_VOIDP, ctypes.c_int]),
+    'FreeImage_OpenMultiBitmap': (_Handle, [ctypes.c_int, ctypes.c_char_p,
+                                            ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int]),
+    'FreeImage_Save': (ctypes.c_int, [ctypes.c_int, _VOIDP, ctypes.c_char_p,
+                                      ctypes.c_int]),
+    'FreeImage_UnlockPage': (None, [_VOIDP, _VOIDP, ctypes.c_int]),
+    'FreeImage_Unload': (None, [_VOIDP])
     }
 
 # Albert's ctypes pattern
@@ -111,6 +167,36 @@ def register_api(lib, api):
 
 register_api(_FI, API)
 
+# FreeImage's pixel layout depends on the platform's byte order, which can't
+# change while we're running: ask once rather than on every read and write.
+_IS_LITTLE_ENDIAN = bool(_FI.FreeImage_IsLittleEndian())
+
+
+def _get_extension_formats():
+    """Return a dict mapping lower-case file extensions (and format names)
+    to FreeImage format ids, as used by FreeImage_GetFIFFromFilename. When
+    several plugins claim an extension, the first one wins, as in FreeImage.
+    """
+    formats = {}
+    for fif in range(_FI.FreeImage_GetFIFCount()):
+        if _FI.FreeImage_IsPluginEnabled(fif) != 1:
+            continue
+        names = [_FI.FreeImage_GetFormatFromFIF(fif)]
+        names += _FI.FreeImage_GetFIFExtensionList(fif).split(b',')
+        for name in names:
+            formats.setdefault(name.lower(), fif)
+    return formats
+
+# FreeImage_GetFIFFromFilename scans every plugin's extension list on each
+# call, so look the file type up in a table built once at import instead.
+_EXTENSION_FORMATS = _get_extension_formats()
+
+
+def _get_format_from_filename(filename):
+    """Equivalent to FreeImage_GetFIFFromFilename for a bytes filename."""
+    extension = filename.rsplit(b'.', 1)[-1]
+    return _EXTENSION_FORMATS.get(extension.lower(), -1)
+
 
 class FI_TYPES(object):
     FIT_UNKNOWN = 0
@@ -178,23 +264,25 @@ class FI_TYPES(object):
         w = _FI.FreeImage_GetWidth(bitmap)
         h = _FI.FreeImage_GetHeight(bitmap)
         fi_type = _FI.FreeImage_GetImageType(bitmap)
-        if not fi_type:
+        try:
+            dtype, extra_dims = _FI_TYPE_TABLE[fi_type]
+        except KeyError:
             raise ValueError('Unknown image pixel type')
-        dtype = cls.dtypes[fi_type]
-        if fi_type == cls.FIT_BITMAP:
+        if extra_dims is None:
+            # FIT_BITMAP: the channel count depends on the bit depth
             bpp = _FI.FreeImage_GetBPP(bitmap)
-            if bpp == 8:
-                extra_dims = []
-            elif bpp == 24:
-                extra_dims = [3]
-            elif bpp == 32:
-                extra_dims = [4]
-            else:
+            try:
+                extra_dims = _BITMAP_EXTRA_DIMS[bpp]
+            except KeyError:
                 raise ValueError('Cannot convert %d BPP bitmap' % bpp)
-        else:
-            extra_dims = cls.extra_dims[fi_type]
-        return numpy.dtype(dtype), [w, h] + extra_dims
+        return dtype, [w, h] + extra_dims
 
+# fi_type -> (dtype, extra_dims) for get_type_and_shape(), which runs for every
+# image read; extra_dims is None for FIT_BITMAP, where it depends on the BPP.
+_FI_TYPE_TABLE = dict((fi_type, (numpy.dtype(dtype),
+                                 FI_TYPES.extra_dims.get(fi_type)))
+                      for fi_type, dtype in FI_TYPES.dtypes.items())
+_BITMAP_EXTRA_DIMS = {8: [], 24: [3], 32: [4]}
 
 class IO_FLAGS(object):
     FIF_LOAD_NOPIXELS = 0x8000  # loading: load the image header only
@@ -302,6 +390,10 @@ class METADATA_MODELS(object):
     FIMD_GEOTIFF = 8
     FIMD_ANIMATION = 9
 
+# (name, number) pairs for each metadata model, e.g. ('EXIF_MAIN', 1)
+_METADATA_MODEL_LIST = tuple((name[5:], number) for name, number in
+    METADATA_MODELS.__dict__.items() if name.startswith('FIMD_'))
+
 
 class METADATA_DATATYPE(object):
     FIDT_BYTE = 1  # 8-bit unsigned integer
@@ -345,30 +437,77 @@ class METADATA_DATATYPE(object):
         }
 
 
-def _process_bitmap(filename, flags, process_func):
+def _load_bitmap(filename, flags):
     filename = asbytes(filename)
     ftype = _FI.FreeImage_GetFileType(filename, 0)
     if ftype == -1:
         raise ValueError('Cannot determine type of file %s' % filename)
     bitmap = _FI.FreeImage_Load(ftype, filename, flags)
-    bitmap = ctypes.c_void_p(bitmap)
     if not bitmap:
         raise ValueError('Could not load file %s' % filename)
+    return bitmap
+
+
+def _process_bitmap(filename, flags, process_func):
+    bitmap = _load_bitmap(filename, flags)
     try:
         return process_func(bitmap)
     finally:
         _FI.FreeImage_Unload(bitmap)
 
 
-def read(filename, flags=0):
+class _BitmapOwner(object):
+    """Owns a loaded FreeImage bitmap, and unloads it when garbage-collected.
+    Arrays that view the bitmap's memory keep a reference to its owner (see
+    _wrap_bitmap_bits_in_array), so the bitmap lives exactly as long as the
+    last such array.
+    """
+    def __init__(self, bitmap):
+        self.bitmap = bitmap
+
+    def __del__(self):
+        _FI.FreeImage_Unload(self.bitmap)
+
+
+def read(filename, flags=0, copy=True):
     """Read an image to a numpy array of shape (width, height) for
     greyscale images, or shape (width, height, nchannels) for RGB or
     RGBA images.
     The `flags` parameter should be one or more values from the IO_FLAGS
     class defined in this module, or-ed together with | as appropriate.
     (See the source-code comments for more details.)
+    Pixels are stored in memory as top-down scanlines, so array.T (or for
+    color images, array.transpose(1, 0, 2)) is a C-contiguous array of shape
+    (height, width[, nchannels]), obtained without copying.
+    If `copy` is False, the returned array will where possible be a view
+    directly onto the memory that FreeImage loaded the image into, which is
+    freed once that array (and any views on it) is no longer referenced. This
+    avoids copying the pixel data, but the array's scanlines will then be
+    stored bottom-up in memory (i.e. with a negative y-stride). 8-bit RGB[A]
+    images are always copied, as their channels must be reordered.
     """
-    return _process_bitmap(filename, flags, _array_from_bitmap)
+    if copy:
+        return _process_bitmap(filename, flags, _array_from_bitmap)
+    bitmap = _load_bitmap(filename, flags)
+    return _array_from_bitmap(bitmap, _BitmapOwner(bitmap))
+
+
+def read_many(filenames, flags=0, workers=None):
+    """Read a sequence of images to a list of numpy arrays, as per read().
+    The images are loaded by a pool of `workers` threads (by default, one per
+    CPU). As ctypes releases the GIL for the duration of each call into
+    FreeImage, the file I/O and decoding of different images proceeds in
+    parallel. (Without the concurrent.futures module, the images are simply
+    read one after another.)
+    The `flags` parameter is as for read().
+    """
+    read_one = functools.partial(read, flags=flags)
+    if futures is None:
+        return [read_one(filename) for filename in filenames]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_one, filenames))
 
 
 def read_metadata(filename):
@@ -382,7 +521,7 @@ def read_metadata(filename):
     return _process_bitmap(filename, flags, _read_metadata)
 
 
-def _process_multipage(filename, flags, process_func):
+def _open_multibitmap(filename, flags):
     filename = asbytes(filename)
     ftype = _FI.FreeImage_GetFileType(filename, 0)
     if ftype == -1:
@@ -393,35 +532,99 @@ def _process_multipage(filename, flags, process_func):
     multibitmap = _FI.FreeImage_OpenMultiBitmap(ftype, filename, create_new,
                                                 read_only, keep_cache_in_memory,
                                                 flags)
-    multibitmap = ctypes.c_void_p(multibitmap)
     if not multibitmap:
         raise ValueError('Could not open %s as multi-page image.' % filename)
+    return multibitmap
+
+
+def _process_page(multibitmap, page, process_func):
+    bitmap = _FI.FreeImage_LockPage(multibitmap, page)
+    if not bitmap:
+        raise ValueError('Could not lock page %d of multi-page image.' % page)
     try:
-        pages = _FI.FreeImage_GetPageCount(multibitmap)
-        out = []
+        return process_func(bitmap)
+    finally:
+        _FI.FreeImage_UnlockPage(multibitmap, bitmap, False)
+
+
+def _process_pages(multibitmap, pages, process_func):
+    """Call process_func(page, bitmap) for each page of an open multibitmap,
+    with the page locked. If concurrent.futures is available, each next page
+    is locked (i.e. loaded and decoded) on a background thread while
+    process_func handles the current one, as ctypes releases the GIL for the
+    duration of FreeImage_LockPage.
+    """
+    if futures is None or pages < 2:
+        for i in range(pages):
+            _process_page(multibitmap, i, functools.partial(process_func, i))
+        return
+    lock_page = functools.partial(_FI.FreeImage_LockPage, multibitmap)
+    with futures.ThreadPoolExecutor(max_workers=1) as executor:
+        next_bitmap = executor.submit(lock_page, 0)
         for i in range(pages):
-            bitmap = _FI.FreeImage_LockPage(multibitmap, i)
-            bitmap = ctypes.c_void_p(bitmap)
+            bitmap = next_bitmap.result()
+            next_bitmap = None
             if not bitmap:
-                raise ValueError('Could not open %s as a multi-page image.'
-                                  % filename)
+                raise ValueError('Could not lock page %d of multi-page image.' % i)
             try:
-                out.append(process_func(bitmap))
+                if i + 1 < pages:
+                    next_bitmap = executor.submit(lock_page, i + 1)
+                process_func(i, bitmap)
+            except:
+                if next_bitmap is not None:
+                    _FI.FreeImage_UnlockPage(multibitmap, next_bitmap.result(),
+                                             False)
+                raise
             finally:
+                # LockPage and UnlockPage both update the multibitmap's table
+                # of locked pages, so must never run at the same time.
+                if next_bitmap is not None:
+                    futures.wait([next_bitmap])
                 _FI.FreeImage_UnlockPage(multibitmap, bitmap, False)
+
+
+def _process_multipage(filename, flags, process_func):
+    multibitmap = _open_multibitmap(filename, flags)
+    try:
+        pages = _FI.FreeImage_GetPageCount(multibitmap)
+        out = [None] * pages
+        def process_page(page, bitmap):
+            out[page] = process_func(bitmap)
+        _process_pages(multibitmap, pages, process_page)
         return out
     finally:
         _FI.FreeImage_CloseMultiBitmap(multibitmap, 0)
 
 
-def read_multipage(filename, flags=0):
+def _read_stacked_pages(filename, flags):
+    multibitmap = _open_multibitmap(filename, flags)
+    try:
+        pages = _FI.FreeImage_GetPageCount(multibitmap)
+        if not pages:
+            raise ValueError('No pages found in multi-page image.')
+        stack = [None]
+        def process_page(page, bitmap):
+            stack[0] = _page_into_stack(bitmap, stack[0], page, pages)
+        _process_pages(multibitmap, pages, process_page)
+        return stack[0]
+    finally:
+        _FI.FreeImage_CloseMultiBitmap(multibitmap, 0)
+
+
+def read_multipage(filename, flags=0, stack=False):
     """Read a multipage image to a list of numpy arrays, where each
     array is of shape (width, height) for greyscale images, or shape
     (width, height, nchannels) for RGB or RGBA images.
     The `flags` parameter should be one or more values from the IO_FLAGS
     class defined in this module, or-ed together with | as appropriate.
     (See the source-code comments for more details.)
+    If `stack` is True, all pages are instead read into a single array of
+    shape (pages, width, height[, nchannels]), which is allocated once up
+    front. All pages must then have the same shape and pixel type, or a
+    ValueError is raised.
     """
+    if stack:
+        return _read_stacked_pages(filename, flags)
     return _process_multipage(filename, flags, _array_from_bitmap)
 
 
@@ -433,10 +636,11 @@ def read_multipage_metadata(filename):
     return _process_multipage(filename, flags, _read_metadata)
 
 
-def _wrap_bitmap_bits_in_array(bitmap, shape, dtype):
+def _wrap_bitmap_bits_in_array(bitmap, shape, dtype, owner=None):
     """Return an ndarray view on the data in a FreeImage bitmap. Only
     valid for as long as the bitmap is loaded (if single page) / locked
-    in memory (if multipage).
+    in memory (if multipage). If a _BitmapOwner for the bitmap is given, the
+    array keeps it alive, and so remains valid for as long as it exists.
     Shape is interpreted as (width, height) or (width, height, nchannels).
     """
     pitch = _FI.FreeImage_GetPitch(bitmap)
@@ -454,58 +658,138 @@ def _wrap_bitmap_bits_in_array(bitmap, shape, dtype):
     else:
         strides = (itemsize, -pitch)
     bits = _FI.FreeImage_GetBits(bitmap)
+    buffer = (ctypes.c_char * byte_size).from_address(bits)
+    if owner is not None:
+        # The array holds a reference to its buffer, so hanging the owner off
+        # of the buffer ties the bitmap's lifetime to that of the array.
+        buffer._owner = owner
     # NB: 'offset' is provided as the start of the last scanline. This way,
     # we start at the top of the image and work our way back down using the
     # negative stride for 'pitch'
-    array = numpy.ndarray(shape, dtype=dtype,
-                          buffer=(ctypes.c_char * byte_size).from_address(bits),
+    array = numpy.ndarray(shape, dtype=dtype, buffer=buffer,
                           strides=strides, offset=pitch*(height-1))
     return array
 
 
-def _array_from_bitmap(bitmap):
+def _is_bgr(shape, dtype):
+    """FreeImage uses BGR[A] pixel layout for 8-bit color images on
+    little-endian systems, whereas our arrays are always RGB[A].
+    """
+    return len(shape) == 3 and _IS_LITTLE_ENDIAN and dtype.type == numpy.uint8
+
+
+def _copy_swapping_red_blue(src, dst):
+    """Copy a (width, height, 3) or (width, height, 4) array into another
+    array of the same shape, exchanging the first and third channels (i.e.
+    RGB[A] <-> BGR[A]). Each pixel is read from src and written to dst once.
+    """
+    if src.shape[2] == 3:
+        dst[:] = src[:, :, ::-1]
+    else:
+        dst[:, :, :3] = src[:, :, 2::-1]
+        dst[:, :, 3] = src[:, :, 3]
+
+
+def _empty_scanline_array(shape, dtype, leading_dims=()):
+    """Return an uninitialized array of shape leading_dims + shape, where
+    shape is (width, height) or (width, height, nchannels). The memory of
+    each image is laid out as traditional top-down scanlines-of-pixels, so
+    the transpose of the array is C-contiguous.
+    """
+    n = len(leading_dims)
+    dims = tuple(leading_dims) + (shape[1], shape[0]) + tuple(shape[2:])
+    return numpy.empty(dims, dtype=dtype).swapaxes(n, n + 1)
+
+
+def _copy_bits_top_down(bitmap, out):
+    """Copy the pixels of a FreeImage bitmap unchanged into an array from
+    _empty_scanline_array. FreeImage itself copies each scanline into place,
+    flipping its bottom-up storage order as it goes.
+    """
+    bpp = _FI.FreeImage_GetBPP(bitmap)
+    topdown = True
+    _FI.FreeImage_ConvertToRawBits(out.ctypes.data, bitmap, out.strides[1],
+                                   bpp, 0, 0, 0, topdown)
+
+
+def _array_from_bitmap(bitmap, owner=None):
     """Convert a FreeImage bitmap pointer to a numpy array.
+    If the bitmap's _BitmapOwner is given, the array will be a view on the
+    bitmap's memory rather than a copy, unless channels have to be reordered.
     """
     dtype, shape = FI_TYPES.get_type_and_shape(bitmap)
-    array = _wrap_bitmap_bits_in_array(bitmap, shape, dtype)
-    # FreeImage uses BGR[A] pixel layout on little-endian systems. Convert to RGB[A].
-    if len(shape) == 3 and _FI.FreeImage_IsLittleEndian() and dtype.type == numpy.uint8:
-        b = array[:, :, 0].copy()
-        array[:, :, 0] = array[:, :, 2]
-        array[:, :, 2] = b
-
-    # We need to copy because array does *not* own its memory after bitmap is freed.
-    # Use order='k' to keep strides. This way the in-memory layout will be
+    bgr = _is_bgr(shape, dtype)
+    if owner is not None and not bgr:
+        return _wrap_bitmap_bits_in_array(bitmap, shape, dtype, owner)
+    # Otherwise we need to copy, because a view on the bitmap does *not* own
+    # its memory after bitmap is freed. The copy's in-memory layout will be
     # the traditional scanlines-of-RGB[A]-pixels (or scanlines-of-grey-pixels)
-    return array.copy(order='k')
+    # from top to bottom, so its transpose is C-contiguous, and no further
+    # copy is needed for callers that want (height, width[, nchannels]) data.
+    out = _empty_scanline_array(shape, dtype)
+    if bgr:
+        # Convert BGR[A] to RGB[A] while copying, so that the pixel data is
+        # only walked once.
+        array = _wrap_bitmap_bits_in_array(bitmap, shape, dtype)
+        _copy_swapping_red_blue(array, out)
+    else:
+        _copy_bits_top_down(bitmap, out)
+    return out
+
+
+def _page_into_stack(bitmap, stack, page, pages):
+    """Copy a FreeImage bitmap into stack[page], first allocating a stack
+    of shape (pages, width, height[, nchannels]) to match the bitmap if stack
+    is None. Returns the stack.
+    """
+    dtype, shape = FI_TYPES.get_type_and_shape(bitmap)
+    if stack is None:
+        # Lay out each page as scanlines in memory, as for single images.
+        stack = _empty_scanline_array(shape, dtype, (pages,))
+    elif dtype != stack.dtype or tuple(shape) != stack.shape[1:]:
+        raise ValueError('Cannot stack pages: page %d differs in shape or type '
+                         'from the first page' % page)
+    if _is_bgr(shape, dtype):
+        array = _wrap_bitmap_bits_in_array(bitmap, shape, dtype)
+        _copy_swapping_red_blue(array, stack[page])
+    else:
+        _copy_bits_top_down(bitmap, stack[page])
+    return stack
+
 
 def _read_metadata(bitmap):
     metadata = {}
-    models = [(name[5:], number) for name, number in
-        METADATA_MODELS.__dict__.items() if name.startswith('FIMD_')]
-
+    # The tag accessors run once per tag, and files can have hundreds of tags,
+    # so look everything up just once here.
+    get_tag_key = _FI.FreeImage_GetTagKey
+    get_tag_type = _FI.FreeImage_GetTagType
+    get_tag_length = _FI.FreeImage_GetTagLength
+    get_tag_value = _FI.FreeImage_GetTagValue
+    find_next_metadata = _FI.FreeImage_FindNextMetadata
+    dtypes = METADATA_DATATYPE.dtypes
+    fidt_ascii = METADATA_DATATYPE.FIDT_ASCII
     tag = ctypes.c_void_p()
-    for model_name, number in models:
-        mdhandle = _FI.FreeImage_FindFirstMetadata(number, bitmap,
-                                                   ctypes.byref(tag))
-        mdhandle = ctypes.c_void_p(mdhandle)
+    tag_ref = ctypes.byref(tag)
+    for model_name, number in _METADATA_MODEL_LIST:
+        mdhandle = _FI.FreeImage_FindFirstMetadata(number, bitmap, tag_ref)
         if mdhandle:
             more = True
             while more:
-                tag_name = asstr(_FI.FreeImage_GetTagKey(tag))
-                tag_type = _FI.FreeImage_GetTagType(tag)
-                byte_size = _FI.FreeImage_GetTagLength(tag)
-                char_ptr = ctypes.c_char * byte_size
-                tag_str = char_ptr.from_address(_FI.FreeImage_GetTagValue(tag))
-                if tag_type == METADATA_DATATYPE.FIDT_ASCII:
-                    tag_val = asstr(tag_str.value)
+                tag_name = asstr(get_tag_key(tag))
+                tag_type = get_tag_type(tag)
+                # string_at copies the value out in one call, without having
+                # to construct a new ctypes array type for each tag's length.
+                tag_str = ctypes.string_at(get_tag_value(tag), get_tag_length(tag))
+                if tag_type == fidt_ascii:
+                    tag_val = asstr(tag_str.split(b'\0', 1)[0])
                 else:
-                    tag_val = numpy.fromstring(tag_str,
-                            dtype=METADATA_DATATYPE.dtypes[tag_type])
+                    # frombuffer wraps the bytes directly without fromstring's
+                    # parsing; copy to get a writable array of our own.
+                    tag_val = numpy.frombuffer(tag_str, dtype=dtypes[tag_type]).copy()
                     if len(tag_val) == 1:
                         tag_val = tag_val[0]
                 metadata[(model_name, tag_name)] = tag_val
-                more = _FI.FreeImage_FindNextMetadata(mdhandle, ctypes.byref(tag))
+                more = find_next_metadata(mdhandle, tag_ref)
             _FI.FreeImage_FindCloseMetadata(mdhandle)
     return metadata
 
@@ -513,14 +797,15 @@ def _read_metadata(bitmap):
 def write(array, filename, flags=0):
     """Write a (width, height) or (width, height, nchannels) array to
     a greyscale, RGB, or RGBA image, with file type deduced from the
-    filename.
+    filename. (float16 arrays are saved as 32-bit floating-point images.)
     The `flags` parameter should be one or more values from the IO_FLAGS
     class defined in this module, or-ed together with | as appropriate.
     (See the source-code comments for more details.)
     """
-    array = numpy.asarray(array)
+    if not isinstance(array, numpy.ndarray):
+        array = numpy.asarray(array)
     filename = asbytes(filename)
-    ftype = _FI.FreeImage_GetFIFFromFilename(filename)
+    ftype = _get_format_from_filename(filename)
     if ftype == -1:
         raise ValueError('Cannot determine type for %s' % filename)
     bitmap, fi_type = _array_to_bitmap(array)
@@ -549,7 +834,7 @@ def write_multipage(arrays, filename, flags=0):
     (See the source-code comments for more details.)
     """
     filename = asbytes(filename)
-    ftype = _FI.FreeImage_GetFIFFromFilename(filename)
+    ftype = _get_format_from_filename(filename)
     if ftype == -1:
         raise ValueError('Cannot determine type of file %s' % filename)
     create_new = True
@@ -558,33 +843,65 @@ def write_multipage(arrays, filename, flags=0):
     multibitmap = _FI.FreeImage_OpenMultiBitmap(ftype, filename,
                                                 create_new, read_only,
                                                 keep_cache_in_memory, 0)
-    multibitmap = ctypes.c_void_p(multibitmap)
     if not multibitmap:
         raise ValueError('Could not open %s for writing multi-page image.' %
                          filename)
+    # FreeImage_AppendPage() encodes the page into the multipage cache right
+    # away, so one bitmap can be refilled for each run of same-shape arrays.
+    bitmap = None
     try:
         for array in arrays:
-            array = numpy.asarray(array)
-            bitmap, fi_type = _array_to_bitmap(array)
+            if not isinstance(array, numpy.ndarray):
+                array = numpy.asarray(array)
+            key = array.shape, array.dtype
+            if bitmap is None or key != bitmap_key:
+                if bitmap is not None:
+                    _FI.FreeImage_Unload(bitmap)
+                    bitmap = None
+                bitmap, _, bitmap_dtype = _allocate_bitmap(*key)
+                bitmap_key = key
+            _copy_array_into_bitmap(array, bitmap, bitmap_dtype)
             _FI.FreeImage_AppendPage(multibitmap, bitmap)
     finally:
+        if bitmap is not None:
+            _FI.FreeImage_Unload(bitmap)
         _FI.FreeImage_CloseMultiBitmap(multibitmap, flags)
 
 # 4-byte quads of 0,v,v,v from 0,0,0,0 to 0,255,255,255
 _GREY_PALETTE = numpy.arange(0, 0x01000000, 0x00010101, dtype=numpy.uint32)
+_GREY_PALETTE_PTR = _GREY_PALETTE.ctypes.data_as(ctypes.c_void_p)
+_GREY_PALETTE_BYTES = _GREY_PALETTE.nbytes
 
 
 def _array_to_bitmap(array):
     """Allocate a FreeImage bitmap and copy a numpy array into it.
 
     """
-    shape, dtype = array.shape, array.dtype
+    bitmap, fi_type, dtype = _allocate_bitmap(array.shape, array.dtype)
+    try:
+        _copy_array_into_bitmap(array, bitmap, dtype)
+        return bitmap, fi_type
+    except:
+        _FI.FreeImage_Unload(bitmap)
+        raise
+
+def _allocate_bitmap(shape, dtype):
+    """Allocate a FreeImage bitmap suitable for storing an array of the given
+    shape and dtype. Returns the bitmap, its FreeImage type, and the dtype of
+    its pixels (which differs from the one given for float16 arrays).
+    """
     if len(shape) == 2:
         nchannels = 1
     elif len(shape) == 3:
         nchannels = shape[2]
     else:
         raise ValueError('Only arrays with shape = (width, height) or (width, height, nchannels) are permitted')
+    dtype = numpy.dtype(dtype)
+    if dtype == numpy.float16:
+        # FreeImage has no half-float image type, so store as 32-bit float.
+        # The conversion is done on the fly when copying into the bitmap,
+        # rather than as a separate pass over the data.
+        dtype = numpy.dtype(numpy.float32)
     try:
         fi_type = FI_TYPES.fi_types[(dtype, nchannels)]
     except KeyError:
@@ -594,27 +911,25 @@ def _array_to_bitmap(array):
     bpp = 8 * itemsize * nchannels
     width, height = shape[:2]
     bitmap = _FI.FreeImage_AllocateT(fi_type, width, height, bpp, 0, 0, 0)
-    bitmap = ctypes.c_void_p(bitmap)
     if not bitmap:
         raise RuntimeError('Could not allocate image for storage')
     try:
-        wrapped_array = _wrap_bitmap_bits_in_array(bitmap, shape, array.dtype)
-        if len(shape) == 3 and _FI.FreeImage_IsLittleEndian() and \
-               dtype.type == numpy.uint8:
-            wrapped_array[:, :, 0] = array[:, :, 2]
-            wrapped_array[:, :, 1] = array[:, :, 1]
-            wrapped_array[:, :, 2] = array[:, :, 0]
-            if shape[2] == 4:
-                wrapped_array[:, :, 3] = array[:, :, 3]
-        else:
-            wrapped_array[:] = array
         if len(shape) == 2 and dtype.type == numpy.uint8:
             palette = _FI.FreeImage_GetPalette(bitmap)
-            palette = ctypes.c_void_p(palette)
             if not palette:
                 raise RuntimeError('Could not get image palette')
-            ctypes.memmove(palette, _GREY_PALETTE.ctypes.data, 1024)
-        return bitmap, fi_type
+            ctypes.memmove(palette, _GREY_PALETTE_PTR, _GREY_PALETTE_BYTES)
+        return bitmap, fi_type, dtype
     except:
         _FI.FreeImage_Unload(bitmap)
-        raise
\ No newline at end of file
+        raise
+
+def _copy_array_into_bitmap(array, bitmap, dtype):
+    """Copy a numpy array into the pixels of a bitmap from _allocate_bitmap()
+    for the same shape; `dtype` is the bitmap pixel dtype it returned."""
+    shape = array.shape
+    wrapped_array = _wrap_bitmap_bits_in_array(bitmap, shape, dtype)
+    if _is_bgr(shape, dtype):
+        _copy_swapping_red_blue(array, wrapped_array)
+    else:
+        wrapped_array[:] = array
\ No newline at end of file
@@ -1,4 +1,16 @@
 import distutils.core
+import distutils.errors
+import distutils.log
+import distutils.sysconfig
+import glob
+import multiprocessing
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
 
 SRCS = '''Source/FreeImage/BitmapAccess.cpp
 Source/FreeImage/ColorLookup.cpp
@@ -147,6 +159,8 @@ Source/LibPNG/pngwio.c
 Source/LibPNG/pngwrite.c
 Source/LibPNG/pngwtran.c
 Source/LibPNG/pngwutil.c
+Source/LibPNG/intel/filter_sse2_intrinsics.c
+Source/LibPNG/intel/intel_init.c
 Source/LibTIFF4/tif_aux.c
 Source/LibTIFF4/tif_close.c
 Source/LibTIFF4/tif_codec.c
@@ -184,8 +198,11 @@ Source/LibTIFF4/tif_warning.c
 Source/LibTIFF4/tif_write.c
 Source/LibTIFF4/tif_zip.c
 Source/ZLib/adler32.c
+Source/ZLib/adler32_simd.c
 Source/ZLib/compress.c
+Source/ZLib/cpu_features.c
 Source/ZLib/crc32.c
+Source/ZLib/crc32_simd.c
 Source/ZLib/deflate.c
 Source/ZLib/gzclose.c
 Source/ZLib/gzlib.c
@@ -209,12 +226,201 @@ Source/LibTIFF4
 Source/ZLib
 Source/OpenEXR/Half'''.split('\n')
 
+# The SIMD code in the bundled zlib, libpng and libtiff picks the best instruction
+# set the CPU supports at runtime. FI_SIMD_LEVEL caps what gets compiled in:
+# 'none' for portable C only, 'sse' to leave out the AVX-512 code paths, or
+# 'avx512' (the default) for everything.
+SIMD_LEVELS = {
+    'none': [('Z_NO_SIMD', None), ('PNG_INTEL_SSE_OPT', '0'), ('TIFF_NO_SIMD', None)],
+    'sse': [('Z_NO_AVX512', None)],
+    'avx512': []
+}
+simd_level = os.environ.get('FI_SIMD_LEVEL', 'avx512').lower()
+if simd_level not in SIMD_LEVELS:
+    raise SystemExit('FI_SIMD_LEVEL must be one of: ' + ', '.join(sorted(SIMD_LEVELS)))
+DEFINES = SIMD_LEVELS[simd_level]
+
+def detect_compiler():
+    """Identify the C compiler distutils will use from its --version output,
+    since the command name alone does not tell (on macOS, gcc is clang).
+    Returns ('gcc' or 'clang', (major, minor)), or (None, None) if the
+    compiler is something else or cannot be run.
+    """
+    if sys.platform == 'win32':
+        return None, None
+    cc = shlex.split(os.environ.get('CC') or distutils.sysconfig.get_config_var('CC') or 'cc')
+    try:
+        out = subprocess.check_output(cc + ['--version'], stderr=subprocess.STDOUT).decode('utf-8', 'replace')
+        match = re.search(r'clang version (\d+)\.(\d+)', out)
+        if match:
+            return 'clang', (int(match.group(1)), int(match.group(2)))
+        if 'Free Software Foundation' in out:
+            # GCC 7 and later may print only the major version here.
+            version = subprocess.check_output(cc + ['-dumpversion']).decode().strip().split('.')
+            return 'gcc', (int(version[0]), int(version[1]) if len(version) > 1 else 0)
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        pass
+    return None, None
+
+COMPILER, COMPILER_VERSION = detect_compiler()
+
+COMPILE_ARGS = []
+LINK_ARGS = []
+if sys.platform != 'win32':
+    # Only the FreeImage API (marked visible by DLL_API in FreeImage.h) and
+    # the module init function need exporting. Hiding everything else lets
+    # calls between the bundled libraries bind directly instead of going
+    # through the PLT.
+    COMPILE_ARGS += ['-fvisibility=hidden']
+
+# Link-time optimization lets the compiler inline across the bundled
+# libraries, e.g. FreeImage_GetScanLine into the plugins' scanline loops.
+# It is used with MSVC, clang and GCC 4.6 or later; other compilers build
+# without it. Set FI_LTO=0 for toolchains without LTO support.
+if os.environ.get('FI_LTO', '1') != '0':
+    if sys.platform == 'win32':
+        COMPILE_ARGS += ['/GL']
+        LINK_ARGS += ['/LTCG']
+    elif COMPILER == 'clang':
+        COMPILE_ARGS += ['-flto']
+        LINK_ARGS += ['-flto']
+    elif COMPILER == 'gcc' and COMPILER_VERSION >= (4, 6):
+        # Without a job count, GCC runs the link-time code generation
+        # serially; -flto=auto needs GCC 10.
+        COMPILE_ARGS += ['-flto']
+        if COMPILER_VERSION >= (10, 0):
+            LINK_ARGS += ['-flto=auto']
+        else:
+            LINK_ARGS += ['-flto=%d' % multiprocessing.cpu_count()]
+        if COMPILER_VERSION >= (5, 0):
+            # Keep the FreeImage API exported but let calls to it from inside
+            # the library be inlined, as clang does by default.
+            COMPILE_ARGS += ['-fno-semantic-interposition']
+
 freeimage = distutils.core.Extension('freeimage._freeimage',
     sources = ['freeimage/_freeimage.c'] + SRCS,
-    include_dirs = INCLUDE)
+    include_dirs = INCLUDE,
+    define_macros = DEFINES,
+    extra_compile_args = COMPILE_ARGS,
+    extra_link_args = LINK_ARGS)
+
+PGO_DIR = os.path.abspath(os.path.join('build', 'pgo'))
+
+# Run by build_pgo against the instrumented build. Reads every image in the
+# directory given as the first argument, or, if none is given, writes and
+# reads back a small set of PNG, JPEG and TIFF images of the common pixel
+# types, so that the zlib, libpng, libjpeg and libtiff hot paths are covered.
+PGO_TRAINING = '''
+import glob, os, sys
+import numpy
+import freeimage
+
+flags = freeimage.IO_FLAGS
+if len(sys.argv) > 1 and sys.argv[1]:
+    images = glob.glob(os.path.join(sys.argv[1], '*'))
+else:
+    y, x = numpy.mgrid[:480, :640]
+    noise = numpy.random.RandomState(0).randint(0, 16, size=x.shape)
+    grey = ((x + y) // 4 + noise) % 256
+    arrays = {
+        'grey': grey.T.astype(numpy.uint8),
+        'grey16': (grey * 257).T.astype(numpy.uint16),
+        'rgb': numpy.dstack([grey, x % 256, y % 256]).transpose(1, 0, 2).astype(numpy.uint8),
+        'rgba': numpy.dstack([grey, x % 256, y % 256, noise * 16]).transpose(1, 0, 2).astype(numpy.uint8)
+    }
+    formats = [
+        ('png', flags.PNG_DEFAULT),
+        ('jpg', flags.JPEG_QUALITYGOOD),
+        ('tif', flags.TIFF_ADOBE_DEFLATE),
+        ('tif', flags.TIFF_LZW)
+    ]
+    images = []
+    for name, array in sorted(arrays.items()):
+        for i, (ext, flag) in enumerate(formats):
+            if ext == 'jpg' and name not in ('grey', 'rgb'):
+                continue
+            filename = '{}-{}.{}'.format(name, i, ext)
+            freeimage.write(array, filename, flag)
+            images.append(filename)
+for i in range(5):
+    for filename in images:
+        try:
+            freeimage.read(filename)
+        except (RuntimeError, ValueError):
+            pass
+'''
+
+class build_pgo(distutils.core.Command):
+    description = 'build the extension with profile-guided optimization'
+    user_options = [
+        ('training-images=', None,
+         'directory of images to read while profiling [default: generated PNG, JPEG and TIFF images]')
+    ]
+
+    def initialize_options(self):
+        self.training_images = None
+
+    def finalize_options(self):
+        if self.training_images is not None:
+            self.training_images = os.path.abspath(self.training_images)
+
+    def run(self):
+        profdata = os.path.join(PGO_DIR, 'freeimage.profdata')
+        if COMPILER == 'clang':
+            generate = ['-fprofile-instr-generate']
+            use = ['-fprofile-instr-use=' + profdata]
+        elif COMPILER == 'gcc':
+            generate = ['-fprofile-generate=' + PGO_DIR]
+            use = ['-fprofile-use=' + PGO_DIR, '-fprofile-correction', '-Wno-missing-profile']
+        else:
+            raise distutils.errors.DistutilsPlatformError('build_pgo supports only GCC and clang')
+
+        if os.path.exists(PGO_DIR):
+            shutil.rmtree(PGO_DIR)
+        self.run_command('build_py')
+        self._build_ext(generate, generate)
+
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(self.get_finalized_command('build_ext').build_lib),
+                   LLVM_PROFILE_FILE=os.path.join(PGO_DIR, 'freeimage-%p.profraw'))
+        workdir = tempfile.mkdtemp()
+        try:
+            # Run outside the source tree so that the freeimage package in
+            # build_lib is imported instead of the one next to setup.py.
+            self._train(workdir, env)
+        finally:
+            shutil.rmtree(workdir)
+
+        if COMPILER == 'clang':
+            profraw = glob.glob(os.path.join(PGO_DIR, '*.profraw'))
+            if not profraw and not self.dry_run:
+                raise distutils.errors.DistutilsExecError('profile training wrote no profile data')
+            self.spawn(self._llvm_profdata() + ['merge', '-output=' + profdata] + profraw)
+        self._build_ext(use, [])
+
+    def _llvm_profdata(self):
+        if 'LLVM_PROFDATA' in os.environ:
+            return shlex.split(os.environ['LLVM_PROFDATA'])
+        if sys.platform == 'darwin':
+            # Xcode's llvm-profdata matches Apple clang but is not on PATH.
+            return ['xcrun', 'llvm-profdata']
+        return ['llvm-profdata']
+
+    def _build_ext(self, compile_args, link_args):
+        freeimage.extra_compile_args = COMPILE_ARGS + compile_args
+        freeimage.extra_link_args = LINK_ARGS + link_args
+        build_ext = self.reinitialize_command('build_ext')
+        build_ext.force = 1
+        self.run_command('build_ext')
+
+    def _train(self, workdir, env):
+        distutils.log.info('running profile training in %s', workdir)
+        cmd = [sys.executable, '-c', PGO_TRAINING, self.training_images or '']
+        if not self.dry_run and subprocess.call(cmd, cwd=workdir, env=env) != 0:
+            raise distutils.errors.DistutilsExecError('profile training run failed')
 
 distutils.core.setup(name = 'freeimage',
         version = '1.0',
         description = 'freeimage package',
         ext_modules = [freeimage],
-        packages = ['freeimage'])
+        packages = ['freeimage'],
+        cmdclass = {'build_pgo': build_pgo})